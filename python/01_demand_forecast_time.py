@@ -3,13 +3,18 @@
 #
 # This script:
 #   1. Connects to the aaa_roadside database.
-#   2. Aggregates calls per hour *per zone*.
+#   2. Aggregates calls per hour *per zone* (via an indexed request_hour column).
 #   3. Fits a Holt-Winters model for EACH ZONE separately.
 #   4. Writes per-zone forecasts to roadside_demand_forecast_hourly.
 
 import os
+import tempfile
+import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed, parallel_config
 from sqlalchemy import create_engine, text
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.exc import DBAPIError
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
 
 # --- CONFIG -----------------------------------------------------------------
@@ -25,28 +30,102 @@ CONNECTION_STRING = (
 )
 
 FORECAST_HORIZON_HOURS = 48
+
+# Rows per multi-row INSERT; lower to 500 if max_allowed_packet is small
+WRITE_CHUNKSIZE = 1000
+
+# Opt-in bulk path: when AAA_LOAD_DATA_MIN_ROWS is set, forecast batches of at
+# least that many rows try LOAD DATA LOCAL INFILE before the multi-row upsert
+# (0 = every batch). Unset by default; the bulk path has not been benchmarked.
+_load_data_min_rows = os.getenv("AAA_LOAD_DATA_MIN_ROWS")
+LOAD_DATA_MIN_ROWS = int(_load_data_min_rows) if _load_data_min_rows else None
 # ----------------------------------------------------------------------------
 
 
 def get_engine():
-    return create_engine(CONNECTION_STRING)
+    return create_engine(
+        CONNECTION_STRING,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        # Client-side LOCAL INFILE is only enabled when the bulk path is on
+        connect_args={"allow_local_infile": LOAD_DATA_MIN_ROWS is not None}
+    )
+
+
+def ensure_hour_index(engine):
+    """
+    Add the hour-truncated request_hour column and a (zone_id, request_hour)
+    index to roadside_requests on first run, so the hourly GROUP BY in
+    load_hourly_counts is answered from the index instead of a full scan
+    and temp-table sort.
+    """
+    check = text("""
+        SELECT COUNT(*)
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE()
+          AND table_name = 'roadside_requests'
+          AND column_name = 'request_hour';
+    """)
+    ddl = text("""
+        ALTER TABLE roadside_requests
+            ADD COLUMN request_hour DATETIME GENERATED ALWAYS AS
+                (DATE_ADD(DATE(request_ts), INTERVAL HOUR(request_ts) HOUR)) STORED,
+            ADD INDEX ix_zone_hour (zone_id, request_hour);
+    """)
+    with engine.begin() as conn:
+        if conn.execute(check).scalar() == 0:
+            conn.execute(ddl)
 
 
 def load_hourly_counts(engine):
     """
     Returns hourly call counts PER ZONE:
        ts_hour, zone_id, call_count
+
+    The series come back dense: every hour between a zone's first and last
+    call is present, with call_count = 0 for hours without calls.
     """
     query = text("""
-        SELECT
-            DATE_FORMAT(request_ts, '%Y-%m-%d %H:00:00') AS ts_hour,
-            zone_id,
-            COUNT(*) AS call_count
-        FROM roadside_requests
-        WHERE zone_id IS NOT NULL
-        GROUP BY DATE_FORMAT(request_ts, '%Y-%m-%d %H:00:00'), zone_id
+        WITH RECURSIVE
+        counts AS (
+            SELECT
+                request_hour AS ts_hour,
+                zone_id,
+                COUNT(*) AS call_count
+            FROM roadside_requests
+            WHERE zone_id IS NOT NULL
+            GROUP BY zone_id, request_hour
+        ),
+        bounds AS (
+            SELECT
+                zone_id,
+                MIN(ts_hour) AS first_hour,
+                MAX(ts_hour) AS last_hour
+            FROM counts
+            GROUP BY zone_id
+        ),
+        hrs AS (
+            SELECT MIN(first_hour) AS h, MAX(last_hour) AS last_h
+            FROM bounds
+            UNION ALL
+            SELECT h + INTERVAL 1 HOUR, last_h
+            FROM hrs
+            WHERE h < last_h
+        )
+        SELECT /*+ SET_VAR(cte_max_recursion_depth = 1000000) */
+            hrs.h AS ts_hour,
+            b.zone_id,
+            COALESCE(c.call_count, 0) AS call_count
+        FROM bounds b
+        JOIN hrs
+          ON hrs.h BETWEEN b.first_hour AND b.last_hour
+        LEFT JOIN counts c
+          ON c.zone_id = b.zone_id
+         AND c.ts_hour = hrs.h
         ORDER BY ts_hour, zone_id;
     """)
+    # Not connectorx: it wraps the query in subqueries where MySQL ignores the
+    # SET_VAR hint, and the hour CTE stops at the default 1000 recursions
     df = pd.read_sql(query, engine, parse_dates=["ts_hour"])
     return df
 
@@ -68,6 +147,84 @@ def ensure_output_table(engine):
         conn.execute(ddl)
 
 
+def upsert_rows(table, conn, keys, data_iter):
+    """
+    pandas to_sql method: one multi-row INSERT ... ON DUPLICATE KEY UPDATE
+    per chunk, so rows already stored for a (ts, zone_id) key are
+    overwritten in place instead of deleted first.
+    """
+    stmt = mysql_insert(table.table).values(
+        [dict(zip(keys, row)) for row in data_iter]
+    )
+    stmt = stmt.on_duplicate_key_update(
+        {k: stmt.inserted[k] for k in keys if k not in ("ts", "zone_id")}
+    )
+    conn.execute(stmt)
+
+
+def load_data_infile(engine, out_df):
+    """
+    Bulk-load out_df into roadside_demand_forecast_hourly.
+    The rows are loaded with a single LOAD DATA LOCAL INFILE into a temporary
+    staging table, then merged with one INSERT ... SELECT ... ON DUPLICATE KEY
+    UPDATE, so existing (ts, zone_id) rows are updated in place exactly as
+    upsert_rows does. Needs local_infile enabled on the server; raises the
+    driver error otherwise.
+    """
+    cols = list(out_df.columns)
+    updates = ", ".join(
+        f"{c} = t.{c}" for c in cols if c not in ("ts", "zone_id")
+    )
+
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="") as fh:
+            # Pin "\n": the default os.linesep would leave a trailing "\r" on
+            # the last column under Windows, given LINES TERMINATED BY '\n'
+            out_df.to_csv(fh, index=False, header=False, na_rep="\\N",
+                          lineterminator="\n")
+
+        load_sql = f"""
+            LOAD DATA LOCAL INFILE '{path.replace(os.sep, "/")}'
+            INTO TABLE tmp_forecast_load
+            FIELDS TERMINATED BY ','
+            LINES TERMINATED BY '\\n'
+            ({", ".join(cols)});
+        """
+        merge_sql = f"""
+            INSERT INTO roadside_demand_forecast_hourly ({", ".join(cols)})
+            SELECT {", ".join("t." + c for c in cols)}
+            FROM tmp_forecast_load t
+            ON DUPLICATE KEY UPDATE {updates};
+        """
+
+        # Temporary tables are per connection, so stage and merge on one
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP TEMPORARY TABLE IF EXISTS tmp_forecast_load;")
+            conn.exec_driver_sql(
+                "CREATE TEMPORARY TABLE tmp_forecast_load "
+                "LIKE roadside_demand_forecast_hourly;"
+            )
+            conn.exec_driver_sql(load_sql)
+            conn.exec_driver_sql(merge_sql)
+            conn.exec_driver_sql("DROP TEMPORARY TABLE tmp_forecast_load;")
+    finally:
+        os.remove(path)
+
+
+def naive_forecast(series, horizon=FORECAST_HORIZON_HOURS):
+    """
+    Flat forecast at the series mean with a +/-20% band.
+    """
+    vals = np.full(horizon, series.mean(), dtype=np.float64)
+    idx = pd.date_range(series.index[-1] + pd.Timedelta(hours=1),
+                        periods=horizon, freq="H")
+    return (pd.Series(vals, index=idx),
+            pd.Series(vals * 0.8, index=idx),
+            pd.Series(vals * 1.2, index=idx),
+            "NaiveMean")
+
+
 def forecast_series(series, horizon=FORECAST_HORIZON_HOURS):
     """
     Holt-Winters additive weekly model.
@@ -75,11 +232,7 @@ def forecast_series(series, horizon=FORECAST_HORIZON_HOURS):
     """
     if len(series) < 24:
         # Too little data → naive
-        mean_val = series.mean()
-        idx = pd.date_range(series.index[-1] + pd.Timedelta(hours=1),
-                            periods=horizon, freq="H")
-        forecast = pd.Series([mean_val] * horizon, index=idx)
-        return forecast, forecast * 0.8, forecast * 1.2, "NaiveMean"
+        return naive_forecast(series, horizon)
 
     try:
         hw = ExponentialSmoothing(
@@ -99,73 +252,99 @@ def forecast_series(series, horizon=FORECAST_HORIZON_HOURS):
 
     except Exception as e:
         print(f"HW failed, using naive for zone: {e}")
-        mean_val = series.mean()
-        idx = pd.date_range(series.index[-1] + pd.Timedelta(hours=1),
-                            periods=horizon, freq="H")
-        forecast = pd.Series([mean_val] * horizon, index=idx)
-        return forecast, forecast * 0.8, forecast * 1.2, "NaiveMean"
+        return naive_forecast(series, horizon)
 
 
-def write_forecasts(engine, df):
+def _fit_zone(zone_id, df_zone, horizon=FORECAST_HORIZON_HOURS):
     """
-    Writes MULTI-ZONE forecasts.
-    Each zone is forecast separately.
+    Fit one zone's model and return
+    (zone_id, forecast, lower_80, upper_80, model_name).
+    Runs inside a joblib worker, so it must not touch the database.
     """
-    ensure_output_table(engine)
+    # load_hourly_counts already returns a gap-free hourly series per zone,
+    # so only the index frequency needs to be declared for statsmodels
+    series = df_zone.set_index("ts_hour")["call_count"]
+    series.index = pd.DatetimeIndex(series.index, freq="H")
 
-    records = []
+    forecast, lower_80, upper_80, model_name = forecast_series(series, horizon)
+    return zone_id, forecast, lower_80, upper_80, model_name
 
-    # Group dataset by zone_id
-    for zone_id, df_zone in df.groupby("zone_id"):
-        # Make a continuous hourly index for this zone
-        df_zone = df_zone.set_index("ts_hour").asfreq("H").fillna(0)
-        series = df_zone["call_count"]
 
-        forecast, lower_80, upper_80, model_name = forecast_series(series)
+def write_forecasts(engine, df, horizon=FORECAST_HORIZON_HOURS):
+    """
+    Writes MULTI-ZONE forecasts.
+    Each zone is forecast separately; the fits are independent, so they
+    run in parallel across all cores.
+    """
+    ensure_output_table(engine)
 
-        for ts in forecast.index:
-            records.append({
-                "ts": ts,
-                "zone_id": int(zone_id),
-                "forecast_calls": float(forecast.loc[ts]),
-                "lower_80": float(lower_80.loc[ts]),
-                "upper_80": float(upper_80.loc[ts]),
-                "model_name": model_name
-            })
+    # One BLAS thread per worker so the zone fits don't oversubscribe cores
+    with parallel_config(backend="loky", inner_max_num_threads=1):
+        fits = Parallel(n_jobs=-1)(
+            delayed(_fit_zone)(zone_id, df_zone, horizon)
+            for zone_id, df_zone in df.groupby("zone_id")
+        )
 
-    out_df = pd.DataFrame(records)
+    if not fits:
+        return
 
-    # Write output
+    # Every zone contributes exactly `horizon` rows, so each output column is
+    # one preallocated typed array filled slice by slice
+    n_rows = len(fits) * horizon
+    ts_arr = np.empty(n_rows, dtype="datetime64[ns]")
+    zone_arr = np.empty(n_rows, dtype=np.int64)
+    forecast_arr = np.empty(n_rows, dtype=np.float64)
+    lower_arr = np.empty(n_rows, dtype=np.float64)
+    upper_arr = np.empty(n_rows, dtype=np.float64)
+    model_arr = np.empty(n_rows, dtype=object)
+
+    for i, (zone_id, forecast, lower_80, upper_80, model_name) in enumerate(fits):
+        rows = slice(i * horizon, (i + 1) * horizon)
+        ts_arr[rows] = forecast.index.to_numpy()
+        zone_arr[rows] = zone_id
+        forecast_arr[rows] = forecast.to_numpy()
+        lower_arr[rows] = lower_80.to_numpy()
+        upper_arr[rows] = upper_80.to_numpy()
+        model_arr[rows] = model_name
+
+    out_df = pd.DataFrame({
+        "ts": ts_arr,
+        "zone_id": zone_arr,
+        "forecast_calls": forecast_arr,
+        "lower_80": lower_arr,
+        "upper_80": upper_arr,
+        "model_name": model_arr
+    })
+
+    if LOAD_DATA_MIN_ROWS is not None and len(out_df) >= LOAD_DATA_MIN_ROWS:
+        try:
+            load_data_infile(engine, out_df)
+            return
+        except DBAPIError as e:
+            print(f"LOAD DATA LOCAL INFILE failed, using multi-row upsert: {e}")
+
+    # Upsert on the (ts, zone_id) primary key
     with engine.begin() as conn:
-        if not out_df.empty:
-            min_ts = out_df["ts"].min()
-            max_ts = out_df["ts"].max()
-
-            conn.execute(
-                text("""
-                    DELETE FROM roadside_demand_forecast_hourly
-                    WHERE ts BETWEEN :min_ts AND :max_ts;
-                """),
-                {"min_ts": min_ts, "max_ts": max_ts}
-            )
-
-            out_df.to_sql(
-                "roadside_demand_forecast_hourly",
-                conn,
-                if_exists="append",
-                index=False
-            )
+        out_df.to_sql(
+            "roadside_demand_forecast_hourly",
+            conn,
+            if_exists="append",
+            index=False,
+            method=upsert_rows,
+            chunksize=WRITE_CHUNKSIZE
+        )
 
 
 def main():
     engine = get_engine()
+    ensure_hour_index(engine)
     df = load_hourly_counts(engine)
 
     if df.empty:
         print("No data found in roadside_requests.")
         return
 
-    print("Zones found:", sorted(df["zone_id"].unique()))
+    print("Zones found:", np.sort(df["zone_id"].unique()).tolist())
     write_forecasts(engine, df)
     print("Multi-zone forecasts written.")
 
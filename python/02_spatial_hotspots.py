@@ -16,6 +16,11 @@ from sqlalchemy import create_engine, text
 from sklearn.cluster import DBSCAN
 import numpy as np
 
+try:
+    import connectorx as cx  # optional: fast columnar reads
+except ImportError:
+    cx = None
+
 # --- CONFIG -----------------------------------------------------------------
 MYSQL_USER = os.getenv("AAA_DB_USER", "root")
 MYSQL_PWD  = os.getenv("AAA_DB_PWD", "root")
@@ -28,14 +33,41 @@ CONNECTION_STRING = (
     f"@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
 )
 
+# Same database, in the URI form connectorx expects
+CONNECTORX_URI = CONNECTION_STRING.replace("mysql+mysqlconnector://", "mysql://", 1)
+
 # DBSCAN parameters: tune these based on your geography
 EPS_KM = 2.0   # approx. radius in kilometers
 MIN_SAMPLES = 3
+EARTH_RADIUS_KM = 6371.0
+
+# Rows per multi-row INSERT; lower to 500 if max_allowed_packet is small
+WRITE_CHUNKSIZE = 1000
 # ----------------------------------------------------------------------------
 
 
 def get_engine():
-    return create_engine(CONNECTION_STRING)
+    return create_engine(
+        CONNECTION_STRING,
+        pool_pre_ping=True,
+        pool_recycle=3600
+    )
+
+
+def read_sql(query, engine, parse_dates=None):
+    """
+    Run a SELECT and return a DataFrame.
+    Uses connectorx when it is installed: it decodes the MySQL result
+    straight into column buffers instead of building Python row tuples.
+    Otherwise falls back to pandas.read_sql over the SQLAlchemy engine.
+    """
+    if cx is None:
+        return pd.read_sql(query, engine, parse_dates=parse_dates)
+
+    df = cx.read_sql(CONNECTORX_URI, str(query), return_type="pandas")
+    for col in parse_dates or []:
+        df[col] = pd.to_datetime(df[col])
+    return df
 
 
 def load_points(engine):
@@ -53,7 +85,7 @@ def load_points(engine):
         WHERE latitude IS NOT NULL
           AND longitude IS NOT NULL;
     """)
-    df = pd.read_sql(query, engine, parse_dates=["request_ts"])
+    df = read_sql(query, engine, parse_dates=["request_ts"])
     return df
 
 
@@ -80,39 +112,41 @@ def ensure_output_table(engine):
         conn.execute(ddl)
 
 
-def haversine_km(lat1, lon1, lat2, lon2):
-    # Vectorized haversine distance in kilometers
-    R = 6371.0
-    lat1_rad = np.radians(lat1)
-    lon1_rad = np.radians(lon1)
-    lat2_rad = np.radians(lat2)
-    dlat = lat2_rad - lat1_rad
-    dlon = np.radians(lon2) - np.radians(lon1)
-    a = (
-        np.sin(dlat / 2.0) ** 2
-        + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon / 2.0) ** 2
-    )
-    c = 2 * np.arcsin(np.sqrt(a))
-    return R * c
+def to_unit_xyz(lat, lon):
+    # Project lat/long (degrees) onto the unit sphere as (n, 3) x/y/z
+    lat_rad = np.radians(np.asarray(lat, dtype=np.float64))
+    lon_rad = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat_rad)
+
+    xyz = np.empty((len(lat_rad), 3), dtype=np.float64, order="C")
+    np.multiply(cos_lat, np.cos(lon_rad), out=xyz[:, 0])
+    np.multiply(cos_lat, np.sin(lon_rad), out=xyz[:, 1])
+    np.sin(lat_rad, out=xyz[:, 2])
+    return xyz
 
 
 def dbscan_for_zone(df_zone):
     """
     Run DBSCAN for a single group of points (here: whole territory).
     """
-    coords = df_zone[["latitude", "longitude"]].to_numpy()
-    if len(coords) < MIN_SAMPLES:
+    if len(df_zone) < MIN_SAMPLES:
         df_zone["cluster"] = -1
         return df_zone
 
-    def metric(u, v):
-        return haversine_km(u[0], u[1], v[0], v[1])
+    xyz = to_unit_xyz(df_zone["latitude"].to_numpy(),
+                      df_zone["longitude"].to_numpy())
 
+    # Chord length on the unit sphere is monotonic in great-circle distance,
+    # so a Euclidean KD-tree with the equivalent chord eps gives the same
+    # clusters as haversine without any trig in the neighbor search.
+    eps_chord = 2 * np.sin(EPS_KM / (2 * EARTH_RADIUS_KM))
     clustering = DBSCAN(
-        eps=EPS_KM,
+        eps=eps_chord,
         min_samples=MIN_SAMPLES,
-        metric=metric
-    ).fit(coords)
+        metric="euclidean",
+        algorithm="kd_tree",
+        n_jobs=-1
+    ).fit(xyz)
 
     df_zone = df_zone.copy()
     df_zone["cluster"] = clustering.labels_
@@ -126,26 +160,34 @@ def compute_hotspots(df):
     """
     df = dbscan_for_zone(df)
 
-    results = []
-    for cluster_id, df_cluster in df.groupby("cluster"):
-        if cluster_id == -1:
-            continue  # noise, skip
-
-        centroid_lat = df_cluster["latitude"].mean()
-        centroid_lng = df_cluster["longitude"].mean()
-        hotspot_score = len(df_cluster)  # simple: number of calls in cluster
+    # Drop noise (cluster = -1) before grouping; it is usually the largest
+    # group and would otherwise be scanned only to be thrown away
+    df_clustered = df[df["cluster"] >= 0]
+    if df_clustered.empty:
+        return pd.DataFrame()
+
+    # One aggregation over the real clusters;
+    # hotspot_score is simply the number of calls in the cluster
+    hotspots = (
+        df_clustered
+        .groupby("cluster", sort=False)
+        .agg(
+            as_of_date=("request_ts", "max"),
+            centroid_lat=("latitude", "mean"),
+            centroid_lng=("longitude", "mean"),
+            hotspot_score=("cluster", "size"),
+        )
+        .reset_index()
+        .rename(columns={"cluster": "cluster_id"})
+    )
 
-        results.append({
-            "as_of_date": df_cluster["request_ts"].max().date(),
-            "zone_id": 0,  # single global zone
-            "cluster_id": int(cluster_id),
-            "centroid_lat": float(centroid_lat),
-            "centroid_lng": float(centroid_lng),
-            "hotspot_score": float(hotspot_score),
-            "method": "DBSCAN_haversine"
-        })
+    hotspots["as_of_date"] = hotspots["as_of_date"].dt.date
+    hotspots["zone_id"] = 0  # single global zone
+    hotspots["hotspot_score"] = hotspots["hotspot_score"].astype(float)
+    hotspots["method"] = "DBSCAN_haversine"
 
-    return pd.DataFrame(results)
+    return hotspots[["as_of_date", "zone_id", "cluster_id", "centroid_lat",
+                     "centroid_lng", "hotspot_score", "method"]]
 
 
 def write_hotspots(engine, hotspots_df):
@@ -160,7 +202,9 @@ def write_hotspots(engine, hotspots_df):
             "roadside_hotspots",
             conn,
             if_exists="append",
-            index=False
+            index=False,
+            method="multi",
+            chunksize=WRITE_CHUNKSIZE
         )
 
 
@@ -4,6 +4,11 @@ import pandas as pd
 from sqlalchemy import create_engine, text
 from sklearn.cluster import DBSCAN
 
+try:
+    import connectorx as cx  # optional: fast columnar reads
+except ImportError:
+    cx = None
+
 # --- CONFIG -----------------------------------------------------------------
 MYSQL_USER = os.getenv("AAA_DB_USER", "root")
 MYSQL_PWD  = os.getenv("AAA_DB_PWD", "root")
@@ -16,13 +21,37 @@ CONNECTION_STRING = (
     f"@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
 )
 
+# Same database, in the URI form connectorx expects
+CONNECTORX_URI = CONNECTION_STRING.replace("mysql+mysqlconnector://", "mysql://", 1)
+
 EPS_KM = 2.0      # clustering radius in kilometers
 MIN_SAMPLES = 3   # minimum points per cluster
+EARTH_RADIUS_KM = 6371.0
 # ----------------------------------------------------------------------------
 
 
 def get_engine():
-    return create_engine(CONNECTION_STRING)
+    return create_engine(
+        CONNECTION_STRING,
+        pool_pre_ping=True,
+        pool_recycle=3600
+    )
+
+
+def read_sql(query, engine, parse_dates=None):
+    """
+    Run a SELECT and return a DataFrame.
+    Uses connectorx when it is installed: it decodes the MySQL result
+    straight into column buffers instead of building Python row tuples.
+    Otherwise falls back to pandas.read_sql over the SQLAlchemy engine.
+    """
+    if cx is None:
+        return pd.read_sql(query, engine, parse_dates=parse_dates)
+
+    df = cx.read_sql(CONNECTORX_URI, str(query), return_type="pandas")
+    for col in parse_dates or []:
+        df[col] = pd.to_datetime(df[col])
+    return df
 
 
 def load_points(engine):
@@ -35,75 +64,88 @@ def load_points(engine):
         WHERE latitude IS NOT NULL
           AND longitude IS NOT NULL;
     """)
-    return pd.read_sql(query, engine)
-
-
-def haversine_km(lat1, lon1, lat2, lon2):
-    R = 6371.0
-    lat1_rad = np.radians(lat1)
-    lon1_rad = np.radians(lon1)
-    lat2_rad = np.radians(lat2)
-    dlat = lat2_rad - lat1_rad
-    dlon = np.radians(lon2) - np.radians(lon1)
-    a = (
-        np.sin(dlat / 2.0) ** 2
-        + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon / 2.0) ** 2
-    )
-    c = 2 * np.arcsin(np.sqrt(a))
-    return R * c
+    return read_sql(query, engine)
+
+
+def to_unit_xyz(lat, lon):
+    # Project lat/long (degrees) onto the unit sphere as (n, 3) x/y/z
+    lat_rad = np.radians(np.asarray(lat, dtype=np.float64))
+    lon_rad = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat_rad)
+
+    xyz = np.empty((len(lat_rad), 3), dtype=np.float64, order="C")
+    np.multiply(cos_lat, np.cos(lon_rad), out=xyz[:, 0])
+    np.multiply(cos_lat, np.sin(lon_rad), out=xyz[:, 1])
+    np.sin(lat_rad, out=xyz[:, 2])
+    return xyz
 
 
 def assign_clusters(df):
-    coords = df[["latitude", "longitude"]].to_numpy()
-    if len(coords) < MIN_SAMPLES:
+    if len(df) < MIN_SAMPLES:
         df["cluster"] = -1
         return df
 
-    def metric(u, v):
-        return haversine_km(u[0], u[1], v[0], v[1])
+    xyz = to_unit_xyz(df["latitude"].to_numpy(), df["longitude"].to_numpy())
 
+    # Euclidean chord distance on the unit sphere orders points exactly like
+    # great-circle distance, so eps_chord reproduces the haversine clusters.
+    eps_chord = 2 * np.sin(EPS_KM / (2 * EARTH_RADIUS_KM))
     clustering = DBSCAN(
-        eps=EPS_KM,
+        eps=eps_chord,
         min_samples=MIN_SAMPLES,
-        metric=metric
-    ).fit(coords)
+        metric="euclidean",
+        algorithm="kd_tree",
+        n_jobs=-1
+    ).fit(xyz)
 
+    labels = clustering.labels_
     df = df.copy()
-    df["cluster"] = clustering.labels_
+    df["cluster"] = labels
 
     # Remap cluster labels to zone_ids:
     #   cluster >= 0 → zone_id = 1..K
     #   cluster = -1 → zone_id = 0 (noise / catch-all)
-    unique_clusters = sorted(c for c in df["cluster"].unique() if c >= 0)
-    cluster_to_zone = {cl: i + 1 for i, cl in enumerate(unique_clusters)}
-
-    def to_zone_id(cluster_label):
-        if cluster_label == -1:
-            return 0
-        return cluster_to_zone.get(cluster_label, 0)
+    # lookup is indexed by cluster + 1, so noise lands on slot 0 → zone 0.
+    unique_clusters = np.unique(labels[labels >= 0])
+    lookup = np.zeros(labels.max() + 2, dtype=np.int32)
+    lookup[unique_clusters + 1] = np.arange(1, len(unique_clusters) + 1)
 
-    df["zone_id"] = df["cluster"].apply(to_zone_id)
+    df["zone_id"] = lookup[labels + 1]
     return df
 
 
 def update_zone_ids(engine, df):
     """
     Update roadside_requests.zone_id from the dataframe.
-    For your synthetic dataset (a few thousand rows), row-by-row UPDATE is fine.
+    Stages the (request_id, zone_id) pairs in a temporary table and applies
+    them with a single JOIN update instead of one UPDATE per row.
     """
+    pairs = df[["request_id", "zone_id"]].astype(int)
+
     with engine.begin() as conn:
-        for _, row in df.iterrows():
-            conn.execute(
-                text("""
-                    UPDATE roadside_requests
-                    SET zone_id = :zone_id
-                    WHERE request_id = :request_id
-                """),
-                {
-                    "zone_id": int(row["zone_id"]),
-                    "request_id": int(row["request_id"])
-                }
-            )
+        conn.execute(text("DROP TEMPORARY TABLE IF EXISTS tmp_zone_assign;"))
+        conn.execute(text("""
+            CREATE TEMPORARY TABLE tmp_zone_assign (
+                request_id  BIGINT PRIMARY KEY,
+                zone_id     INT
+            ) ENGINE=MEMORY;
+        """))
+
+        pairs.to_sql(
+            "tmp_zone_assign",
+            conn,
+            if_exists="append",
+            index=False,
+            method="multi",
+            chunksize=10000
+        )
+
+        conn.execute(text("""
+            UPDATE roadside_requests r
+            JOIN tmp_zone_assign t USING (request_id)
+            SET r.zone_id = t.zone_id;
+        """))
+        conn.execute(text("DROP TEMPORARY TABLE tmp_zone_assign;"))
 
 
 def main():
@@ -3,9 +3,8 @@
 # integer programming model.
 #
 # Uses:
-#   - pandas
+#   - pandas / numpy
 #   - SQLAlchemy
-#   - pulp (linear/integer programming)
 #
 # This script:
 #   1. Reads hourly forecasts from roadside_demand_forecast_hourly.
@@ -14,9 +13,15 @@
 #   4. Writes recommendations into roadside_staffing_plan.
 
 import os
+import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine, text
-import pulp
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+try:
+    import connectorx as cx  # optional: fast columnar reads
+except ImportError:
+    cx = None
 
 # --------------------------------------------------------------------
 # CONFIG
@@ -32,15 +37,41 @@ CONNECTION_STRING = (
     f"@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
 )
 
+# Same database, in the URI form connectorx expects
+CONNECTORX_URI = CONNECTION_STRING.replace("mysql+mysqlconnector://", "mysql://", 1)
+
 # Simple capacity assumptions
 CALLS_PER_TRUCK_PER_HOUR = 2.0   # how many calls one truck can handle per hour
 TARGET_SERVICE_LEVEL      = 0.90  # cover 90% of forecasted demand
+
+# Rows per multi-row INSERT; lower to 500 if max_allowed_packet is small
+WRITE_CHUNKSIZE = 1000
 # --------------------------------------------------------------------
 
 
 def get_engine():
     """Create a SQLAlchemy engine."""
-    return create_engine(CONNECTION_STRING)
+    return create_engine(
+        CONNECTION_STRING,
+        pool_pre_ping=True,
+        pool_recycle=3600
+    )
+
+
+def read_sql(query, engine, parse_dates=None):
+    """
+    Run a SELECT and return a DataFrame.
+    Uses connectorx when it is installed: it decodes the MySQL result
+    straight into column buffers instead of building Python row tuples.
+    Otherwise falls back to pandas.read_sql over the SQLAlchemy engine.
+    """
+    if cx is None:
+        return pd.read_sql(query, engine, parse_dates=parse_dates)
+
+    df = cx.read_sql(CONNECTORX_URI, str(query), return_type="pandas")
+    for col in parse_dates or []:
+        df[col] = pd.to_datetime(df[col])
+    return df
 
 
 def load_forecast(engine):
@@ -60,7 +91,7 @@ def load_forecast(engine):
         FROM roadside_demand_forecast_hourly
         ORDER BY ts, zone_id;
     """)
-    df = pd.read_sql(query, engine, parse_dates=["ts"])
+    df = read_sql(query, engine, parse_dates=["ts"])
     return df
 
 
@@ -89,16 +120,20 @@ def optimize_staffing(df,
                       calls_per_truck=CALLS_PER_TRUCK_PER_HOUR,
                       target_service_lvl=TARGET_SERVICE_LEVEL):
     """
-    Build and solve an integer programming model to recommend trucks per zone/hour.
+    Recommend trucks per zone/hour from the integer programming model:
 
     Decision variable:
-      x[z, t] = integer number of trucks in zone z at time t.
+      x[z, t] = integer number of trucks in zone z at time t (x >= 0).
 
     Objective:
       Minimize total trucks across zones and hours.
 
     Constraint:
       x[z, t] * calls_per_truck >= forecast_calls[z, t] * target_service_lvl
+
+    Each constraint bounds only its own x[z, t] and nothing couples cells, so
+    the optimum is simply the smallest integer meeting each cell's demand:
+      x[z, t] = ceil(max(forecast_calls * target_service_lvl, 0) / calls_per_truck)
     """
     if df.empty:
         return pd.DataFrame()
@@ -107,76 +142,40 @@ def optimize_staffing(df,
     df = df.copy()
     df["zone_id"] = df["zone_id"].astype(int)
 
-    # Demand dictionary: keys are (zone_id:int, ts:Timestamp)
-    demand = {
-        (int(row.zone_id), row.ts): float(row.forecast_calls)
-        for row in df.itertuples()
-    }
-
-    zones = sorted(int(z) for z in df["zone_id"].unique())
-    times = sorted(df["ts"].unique())
-
+    zones = np.sort(df["zone_id"].unique()).tolist()
     print(f"Zones in forecast: {zones}")
 
-    # Define the optimization model
-    model = pulp.LpProblem("Truck_Staffing", pulp.LpMinimize)
-
-    # Decision variables: number of trucks for each (zone, time)
-    x = {}
-    for z in zones:
-        for t in times:
-            # Only create variables where we actually have demand key
-            if (z, t) in demand:
-                t_str = t.strftime("%Y%m%d%H")
-                var_name = f"x_{z}_{t_str}"
-                x[(z, t)] = pulp.LpVariable(var_name, lowBound=0, cat="Integer")
-
-    if not x:
-        # No variables → no demand / no forecast
-        return pd.DataFrame()
+    required_calls = np.maximum(df["forecast_calls"].to_numpy() * target_service_lvl, 0)
+    df["num_trucks"] = np.ceil(required_calls / calls_per_truck).astype(int)
+    df["target_service_lvl"] = target_service_lvl
 
-    # Objective: minimize total number of trucks across all zones and times
-    model += pulp.lpSum(x[(z, t)] for (z, t) in x), "Total_Trucks"
+    staffing_df = (
+        df[["ts", "zone_id", "num_trucks", "forecast_calls", "target_service_lvl"]]
+        .sort_values(["ts", "zone_id"])
+    )
+    return staffing_df
 
-    # Constraints: each zone-hour must cover target % of demand
-    for (z, t), var in x.items():
-        fc = demand[(z, t)]
-        required_calls = fc * target_service_lvl
-        model += (
-            var * calls_per_truck >= required_calls,
-            f"DemandCoverage_z{z}_t{t.strftime('%Y%m%d%H')}"
-        )
 
-    # Solve
-    solver = pulp.PULP_CBC_CMD(msg=False)
-    model.solve(solver)
-
-    # Collect solution
-    records = []
-    for (z, t), var in x.items():
-        trucks = var.varValue
-        if trucks is None:
-            trucks = 0
-        trucks = int(round(trucks))
-
-        fc = demand[(z, t)]
-
-        records.append({
-            "ts": t,
-            "zone_id": int(z),
-            "num_trucks": trucks,
-            "forecast_calls": fc,
-            "target_service_lvl": target_service_lvl,
-        })
-
-    staffing_df = pd.DataFrame(records).sort_values(["ts", "zone_id"])
-    return staffing_df
+def upsert_rows(table, conn, keys, data_iter):
+    """
+    pandas to_sql method: one multi-row INSERT ... ON DUPLICATE KEY UPDATE
+    per chunk, so rows already stored for a (ts, zone_id) key are
+    overwritten in place instead of deleted first.
+    """
+    stmt = mysql_insert(table.table).values(
+        [dict(zip(keys, row)) for row in data_iter]
+    )
+    stmt = stmt.on_duplicate_key_update(
+        {k: stmt.inserted[k] for k in keys if k not in ("ts", "zone_id")}
+    )
+    conn.execute(stmt)
 
 
 def write_staffing_plan(engine, staffing_df, model_name_hint="HW_or_Naive"):
     """
     Persist the staffing recommendations to roadside_staffing_plan.
-    Uses a simple delete-and-reinsert strategy for the forecast horizon.
+    Upserts on (ts, zone_id), so re-running over the same horizon overwrites
+    the existing rows.
     """
     if staffing_df.empty:
         return
@@ -187,23 +186,15 @@ def write_staffing_plan(engine, staffing_df, model_name_hint="HW_or_Naive"):
     out_df = staffing_df.copy()
     out_df["model_name"] = model_name_hint
 
+    # Upsert on the (ts, zone_id) primary key
     with engine.begin() as conn:
-        # Delete any existing rows in this time range to avoid duplicates
-        min_ts = out_df["ts"].min()
-        max_ts = out_df["ts"].max()
-
-        delete_sql = text("""
-            DELETE FROM roadside_staffing_plan
-            WHERE ts BETWEEN :min_ts AND :max_ts;
-        """)
-        conn.execute(delete_sql, {"min_ts": min_ts, "max_ts": max_ts})
-
-        # Insert new results
         out_df.to_sql(
             "roadside_staffing_plan",
             conn,
             if_exists="append",
-            index=False
+            index=False,
+            method=upsert_rows,
+            chunksize=WRITE_CHUNKSIZE
         )
 
 
@@ -1,7 +1,9 @@
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-import random
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from datetime import datetime
+import shutil
 import string
 
 # -----------------------------
@@ -18,27 +20,19 @@ START_DATE = datetime(2024, 1, 1)
 END_DATE   = datetime(2024, 3, 31, 23, 59, 59)
 
 np.random.seed(42)
-random.seed(42)
 
 # -----------------------------
 # HELPER FUNCTIONS
 # -----------------------------
 
-def random_timestamp(start: datetime, end: datetime) -> datetime:
-    """Generate a random datetime between start and end."""
-    delta = end - start
-    seconds = random.randint(0, int(delta.total_seconds()))
-    return start + timedelta(seconds=seconds)
-
-def generate_vin():
-    """Generate a fake VIN-like string (not real, just looks plausible)."""
+def generate_vins(n):
+    """Generate n fake VIN-like strings (not real, just look plausible)."""
     chars = string.ascii_uppercase + string.digits
     # Exclude I, O, Q commonly omitted in real VINs, but this is synthetic anyway.
     chars = chars.replace("I", "").replace("O", "").replace("Q", "")
-    return "".join(random.choices(chars, k=17))
-
-def random_choice_with_weights(options, weights):
-    return random.choices(options, weights=weights, k=1)[0]
+    # Draw an (n, 17) grid of single characters and view each row as one string
+    grid = np.random.choice(np.array(list(chars)), size=(n, 17))
+    return np.ascontiguousarray(grid).view("U17").ravel()
 
 # -----------------------------
 # SETUP: REGIONS / HOTSPOTS
@@ -90,121 +84,132 @@ TRUCK_IDS = list(range(100, 150))
 # -----------------------------
 # CREATE BASE RECORDS
 # -----------------------------
+# Every column is drawn for all N_RECORDS at once with NumPy instead of
+# building the rows one at a time.
+
+n = N_RECORDS
+request_id = START_REQUEST_ID + np.arange(n)
+
+# Pick a zone, and a ZIP within that zone
+zone_idx = np.random.randint(0, len(ZONES), n)
+city = np.array([z["city"] for z in ZONES])[zone_idx]
+state = np.array([z["state"] for z in ZONES])[zone_idx]
+
+n_zips = np.array([len(z["zip_codes"]) for z in ZONES])
+max_zips = n_zips.max()
+zip_table = np.array([z["zip_codes"] + [""] * (max_zips - len(z["zip_codes"]))
+                      for z in ZONES])
+zip_pos = (np.random.random(n) * n_zips[zone_idx]).astype(int)
+zip_code = zip_table[zone_idx, zip_pos]
+
+# Lat/long around the center with a small random offset
+centers = np.array([[z["center_lat"], z["center_lon"]] for z in ZONES])[zone_idx]
+latitude = centers[:, 0] + np.random.normal(scale=0.02, size=n)
+longitude = centers[:, 1] + np.random.normal(scale=0.02, size=n)
+
+# Time with some realistic patterns:
+# - More calls during rush hours (7–9am, 4–7pm)
+# - More calls on weekends
+# Generate a random timestamp, then "bias" it a bit
+total_seconds = int((END_DATE - START_DATE).total_seconds())
+base_ts = pd.Timestamp(START_DATE) + pd.to_timedelta(
+    np.random.randint(0, total_seconds + 1, n), unit="s"
+)
+hour = base_ts.hour.to_numpy()
+dow = base_ts.dayofweek.to_numpy()  # 0=Mon, 6=Sun
+
+# Slight bias: if off-peak, sometimes resample into peak
+peak_hours = np.array([7, 8, 9, 16, 17, 18, 19])
+to_peak = ~np.isin(hour, peak_hours) & (np.random.random(n) < 0.3)
+peak_ts = (
+    base_ts.normalize()
+    + pd.to_timedelta(np.random.choice(peak_hours, n), unit="h")
+    + pd.to_timedelta(np.random.randint(0, 60, n), unit="m")
+    + pd.to_timedelta(np.random.randint(0, 60, n), unit="s")
+)
+base_ts = base_ts.where(~to_peak, peak_ts)
 
-records = []
-
-for i in range(N_RECORDS):
-    request_id = START_REQUEST_ID + i
-
-    # Pick a zone
-    zone = random.choice(ZONES)
-    city = zone["city"]
-    state = zone["state"]
-    zip_code = random.choice(zone["zip_codes"])
-
-    # Lat/long around the center with a small random offset
-    latitude = zone["center_lat"] + np.random.normal(scale=0.02)
-    longitude = zone["center_lon"] + np.random.normal(scale=0.02)
-
-    # Time with some realistic patterns:
-    # - More calls during rush hours (7–9am, 4–7pm)
-    # - More calls on weekends
-    # Generate a random timestamp, then "bias" it a bit
-    base_ts = random_timestamp(START_DATE, END_DATE)
-    hour = base_ts.hour
-    dow = base_ts.weekday()  # 0=Mon, 6=Sun
-
-    # Slight bias: if off-peak, sometimes resample into peak
-    if hour not in [7, 8, 9, 16, 17, 18, 19] and random.random() < 0.3:
-        # Force into a peak-ish hour
-        peak_hours = [7, 8, 9, 16, 17, 18, 19]
-        new_hour = random.choice(peak_hours)
-        base_ts = base_ts.replace(
-            hour=new_hour,
-            minute=random.randint(0, 59),
-            second=random.randint(0, 59)
-        )
-
-    # Slight extra weekend bias
-    if dow >= 5 and random.random() < 0.3:
-        # Nudge timestamp slightly to simulate clusters
-        base_ts += timedelta(minutes=random.randint(-30, 30))
-
-    request_ts = base_ts
-
-    # Timestamps: dispatch after request, arrival after dispatch, completion after arrival
-    dispatch_delay_min = random.randint(1, 20)
-    arrival_delay_min = random.randint(5, 45)
-    completion_delay_min = random.randint(10, 90)
-
-    dispatch_ts = request_ts + timedelta(minutes=dispatch_delay_min)
-    arrival_ts = dispatch_ts + timedelta(minutes=arrival_delay_min)
-    completion_ts = arrival_ts + timedelta(minutes=completion_delay_min)
-
-    # Truck, member, VIN, etc.
-    truck_id = random.choice(TRUCK_IDS)
-
-    member_id = random.randint(1000, 9999)
-
-    # membership start up to 10 years before the request
-    max_years_back = 10 * 365
-    membership_offset_days = random.randint(0, max_years_back)
-    membership_start = request_ts - timedelta(days=membership_offset_days)
-
-    # 70% of the time, member lives in the same ZIP where service occurs
-    if random.random() < 0.7:
-        member_home_zip = zip_code
-    else:
-        # 30% of the time, member lives in a different ZIP
-        other_zips = [z for z in ALL_ZIPS if z != zip_code]
-        member_home_zip = random.choice(other_zips)
-
-    road_type = random_choice_with_weights(ROAD_TYPES, ROAD_TYPE_WEIGHTS)
-    issue_type = random_choice_with_weights(ISSUE_TYPES, ISSUE_TYPE_WEIGHTS)
-    call_source = random_choice_with_weights(CALL_SOURCES, CALL_SOURCE_WEIGHTS)
-
-    # miles_towed: depends loosely on road_type and issue_type
-    if issue_type == "TOW":
-        if road_type == "HIGHWAY":
-            miles_towed = max(0.5, np.random.normal(loc=15, scale=8))
-        else:
-            miles_towed = max(0.5, np.random.normal(loc=8, scale=5))
-    else:
-        # non-tow services often 0 miles
-        if random.random() < 0.7:
-            miles_towed = 0.0
-        else:
-            miles_towed = max(0.5, np.random.normal(loc=5, scale=3))
-
-    miles_towed = round(float(miles_towed), 1)
-
-    vin = generate_vin()
-
-    records.append(
-        dict(
-            request_id=request_id,
-            member_id=member_id,
-            request_ts=request_ts,
-            dispatch_ts=dispatch_ts,
-            arrival_ts=arrival_ts,
-            completion_ts=completion_ts,
-            latitude=round(latitude, 6),
-            longitude=round(longitude, 6),
-            zip_code=zip_code,
-            city=city,
-            state=state,
-            road_type=road_type,
-            issue_type=issue_type,
-            truck_id=truck_id,
-            vin=vin,
-            miles_towed=miles_towed,
-            call_source=call_source,
-            membership_start=membership_start,
-            member_home_zip=member_home_zip,
-        )
-    )
+# Slight extra weekend bias: nudge timestamp slightly to simulate clusters
+nudge = (dow >= 5) & (np.random.random(n) < 0.3)
+nudge_min = np.where(nudge, np.random.randint(-30, 31, n), 0)
+request_ts = base_ts + pd.to_timedelta(nudge_min, unit="m")
+
+# Timestamps: dispatch after request, arrival after dispatch, completion after arrival
+dispatch_ts = request_ts + pd.to_timedelta(np.random.randint(1, 21, n), unit="m")
+arrival_ts = dispatch_ts + pd.to_timedelta(np.random.randint(5, 46, n), unit="m")
+completion_ts = arrival_ts + pd.to_timedelta(np.random.randint(10, 91, n), unit="m")
+
+# Truck, member, VIN, etc.
+truck_id = np.random.choice(TRUCK_IDS, n)
+
+member_id = np.random.randint(1000, 10000, n)
 
-df = pd.DataFrame(records)
+# membership start up to 10 years before the request
+max_years_back = 10 * 365
+membership_start = request_ts - pd.to_timedelta(
+    np.random.randint(0, max_years_back + 1, n), unit="D"
+)
+
+# 70% of the time, member lives in the same ZIP where service occurs;
+# otherwise pick uniformly among the *other* ZIPs by skipping over our own
+# (ALL_ZIPS is the zones' ZIP lists concatenated in order)
+all_zips = np.array(ALL_ZIPS)
+zip_offset = np.concatenate([[0], np.cumsum(n_zips)[:-1]])
+own_pos = zip_offset[zone_idx] + zip_pos
+other_pos = np.random.randint(0, len(all_zips) - 1, n)
+other_pos += other_pos >= own_pos
+member_home_zip = np.where(np.random.random(n) < 0.7,
+                           zip_code, all_zips[other_pos])
+
+road_type = np.random.choice(ROAD_TYPES, n, p=ROAD_TYPE_WEIGHTS)
+issue_type = np.random.choice(ISSUE_TYPES, n, p=ISSUE_TYPE_WEIGHTS)
+call_source = np.random.choice(CALL_SOURCES, n, p=CALL_SOURCE_WEIGHTS)
+
+# miles_towed: depends loosely on road_type and issue_type
+is_tow = issue_type == "TOW"
+is_highway = road_type == "HIGHWAY"
+miles_towed = np.zeros(n)
+
+tow_hwy = is_tow & is_highway
+miles_towed[tow_hwy] = np.random.normal(loc=15, scale=8, size=tow_hwy.sum())
+
+tow_other = is_tow & ~is_highway
+miles_towed[tow_other] = np.random.normal(loc=8, scale=5, size=tow_other.sum())
+
+# non-tow services often 0 miles
+non_tow_miles = ~is_tow & (np.random.random(n) >= 0.7)
+miles_towed[non_tow_miles] = np.random.normal(loc=5, scale=3,
+                                              size=non_tow_miles.sum())
+
+has_miles = tow_hwy | tow_other | non_tow_miles
+miles_towed[has_miles] = np.maximum(0.5, miles_towed[has_miles])
+miles_towed = np.round(miles_towed, 1)
+
+vin = generate_vins(n)
+
+df = pd.DataFrame(
+    dict(
+        request_id=request_id,
+        member_id=member_id,
+        request_ts=request_ts,
+        dispatch_ts=dispatch_ts,
+        arrival_ts=arrival_ts,
+        completion_ts=completion_ts,
+        latitude=np.round(latitude, 6),
+        longitude=np.round(longitude, 6),
+        zip_code=zip_code,
+        city=city,
+        state=state,
+        road_type=road_type,
+        issue_type=issue_type,
+        truck_id=truck_id,
+        vin=vin,
+        miles_towed=miles_towed,
+        call_source=call_source,
+        membership_start=membership_start,
+        member_home_zip=member_home_zip,
+    )
+)
 
 # -----------------------------
 # INJECT SOME FRAUD / ANOMALIES
@@ -212,30 +217,38 @@ df = pd.DataFrame(records)
 
 # 1) Duplicate VINs used many times (potential fraud)
 num_fraud_vins = 20
-fraud_vins = [generate_vin() for _ in range(num_fraud_vins)]
+fraud_vins = generate_vins(num_fraud_vins)
 
-# Randomly pick ~5–15 rows per fraud VIN and assign that VIN
-for fv in fraud_vins:
-    idxs = df.sample(random.randint(5, 15)).index
-    df.loc[idxs, "vin"] = fv
+# Randomly pick ~5–15 rows per fraud VIN and assign all of them in one write
+fraud_sizes = np.random.randint(5, 16, num_fraud_vins)
+fraud_idxs = df.sample(fraud_sizes.sum()).index
+df.loc[fraud_idxs, "vin"] = np.repeat(fraud_vins, fraud_sizes)
 
 # 2) Overlapping jobs for the same truck (truck seems to be in two places at once)
 # Pick some trucks and force overlapping arrival/completion windows
-overlap_trucks = random.sample(TRUCK_IDS, 5)
-for t in overlap_trucks:
-    truck_rows = df[df["truck_id"] == t].sample(5, replace=False)
-    # Force them to all overlap within a 1-hour window
-    base_time = random_timestamp(START_DATE, END_DATE)
-    for j, idx in enumerate(truck_rows.index):
-        request_ts = base_time + timedelta(minutes=j * 5)
-        dispatch_ts = request_ts + timedelta(minutes=5)
-        arrival_ts = dispatch_ts + timedelta(minutes=5)
-        completion_ts = arrival_ts + timedelta(minutes=20)
-
-        df.loc[idx, "request_ts"] = request_ts
-        df.loc[idx, "dispatch_ts"] = dispatch_ts
-        df.loc[idx, "arrival_ts"] = arrival_ts
-        df.loc[idx, "completion_ts"] = completion_ts
+overlap_trucks = np.random.choice(TRUCK_IDS, 5, replace=False)
+truck_rows = (
+    df[df["truck_id"].isin(overlap_trucks)]
+    .groupby("truck_id")
+    .sample(5, replace=False)
+)
+
+# Force each truck's 5 jobs to overlap within a 1-hour window starting at a
+# random base time per truck, staggered 5 minutes apart
+base_secs = pd.Series(np.random.randint(0, total_seconds + 1, len(overlap_trucks)),
+                      index=overlap_trucks)
+stagger = truck_rows.groupby("truck_id").cumcount().to_numpy() * 5
+overlap_request_ts = (
+    pd.Timestamp(START_DATE)
+    + pd.to_timedelta(base_secs.loc[truck_rows["truck_id"]].to_numpy(), unit="s")
+    + pd.to_timedelta(stagger, unit="m")
+)
+overlap_ts = pd.DataFrame({"request_ts": overlap_request_ts}, index=truck_rows.index)
+overlap_ts["dispatch_ts"] = overlap_ts["request_ts"] + pd.Timedelta(minutes=5)
+overlap_ts["arrival_ts"] = overlap_ts["dispatch_ts"] + pd.Timedelta(minutes=5)
+overlap_ts["completion_ts"] = overlap_ts["arrival_ts"] + pd.Timedelta(minutes=20)
+
+df.loc[overlap_ts.index, overlap_ts.columns] = overlap_ts
 
 # 3) Impossible miles_towed (too many miles in too little time)
 # e.g., 200 miles towed in 15 minutes
@@ -249,16 +262,17 @@ df.loc[fraud_miles_rows, "miles_towed"] = 200.0
 # Sort by request_ts for readability
 df = df.sort_values("request_ts").reset_index(drop=True)
 
-# Format datetime columns as strings MySQL likes
+# Whole-second timestamps: Arrow writes timestamp[s] as "YYYY-MM-DD HH:MM:SS",
+# the format MySQL likes
 datetime_cols = ["request_ts", "dispatch_ts", "arrival_ts", "completion_ts", "membership_start"]
-for col in datetime_cols:
-    df[col] = df[col].dt.strftime("%Y-%m-%d %H:%M:%S")
+df[datetime_cols] = df[datetime_cols].astype("datetime64[s]")
 
-# Write to working directory
+# Write to working directory with Arrow's (multithreaded C++) CSV writer;
+# string fields are quoted, which LOAD DATA's ENCLOSED BY '"' handles
 output_file = "synthetic_roadside_requests.csv"
-df.to_csv(output_file, index=False)
+pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), output_file)
 
-# Write to MySQL secure upload directory
+# Copy the same file to the MySQL secure upload directory
 output_file_secure = r"C:/ProgramData/MySQL/MySQL Server 8.0/Uploads/synthetic_roadside_requests.csv"
-df.to_csv(output_file_secure, index=False)
+shutil.copyfile(output_file, output_file_secure)
 
@@ -1,36 +1,60 @@
+import os
+
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from joblib import Parallel, delayed, parallel_config
 from sklearn.cluster import DBSCAN
-from math import radians, cos, sin, asin, sqrt
+from sklearn.neighbors import NearestNeighbors
 
-# ---------------------------------------------------
-# Load your synthetic roadside data
-# ---------------------------------------------------
-df = pd.read_csv("synthetic_roadside_requests.csv")
+EARTH_RADIUS_KM = 6371.0
 
-coords = df[["latitude", "longitude"]].values
 
+def to_unit_xyz(lat, lon):
+    # Project lat/long (degrees) onto the unit sphere as (n, 3) x/y/z
+    lat_rad = np.radians(np.asarray(lat, dtype=np.float64))
+    lon_rad = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat_rad)
 
-# ---------------------------------------------------
-# Haversine distance (in KM) for DBSCAN
-# ---------------------------------------------------
-def haversine_km(p1, p2):
-    lat1, lon1 = p1
-    lat2, lon2 = p2
+    xyz = np.empty((len(lat_rad), 3), dtype=np.float64, order="C")
+    np.multiply(cos_lat, np.cos(lon_rad), out=xyz[:, 0])
+    np.multiply(cos_lat, np.sin(lon_rad), out=xyz[:, 1])
+    np.sin(lat_rad, out=xyz[:, 2])
+    return xyz
 
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
 
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    r = 6371  # Earth radius in KM
-    return c * r
+def chord(eps):
+    # Straight-line distance on the unit sphere for a great-circle eps in km
+    return 2 * np.sin(eps / (2 * EARTH_RADIUS_KM))
 
 
-# sklearn expects a *callable metric* that takes 2 rows, so wrap it
-def metric(a, b):
-    return haversine_km(a, b)
+def run_eps(G, eps, min_samples):
+    # One DBSCAN fit on the shared precomputed graph; eps in km
+    clustering = DBSCAN(
+        eps=chord(eps),
+        min_samples=min_samples,
+        metric="precomputed"
+    ).fit(G)
+    return eps, clustering.labels_
+
+
+# ---------------------------------------------------
+# Load your synthetic roadside data
+# ---------------------------------------------------
+# Only the two coordinate columns are parsed, straight into Arrow buffers,
+# instead of building a full DataFrame of every request field.
+tbl = pa_csv.read_csv(
+    "synthetic_roadside_requests.csv",
+    convert_options=pa_csv.ConvertOptions(
+        include_columns=["latitude", "longitude"],
+        column_types={"latitude": pa.float64(), "longitude": pa.float64()}
+    )
+)
+coords = np.column_stack([
+    tbl["latitude"].to_numpy(),
+    tbl["longitude"].to_numpy()
+])
 
 
 # ---------------------------------------------------
@@ -39,35 +63,59 @@ def metric(a, b):
 eps_values = [0.5, 1.0, 1.5, 2.0]
 min_samples = 5
 
-print("\n=== DBSCAN EPS Parameter Sweep ===\n")
 
-for eps in eps_values:
-    clustering = DBSCAN(
-        eps=eps,
-        min_samples=min_samples,
-        metric=metric
-    ).fit(coords)
+# ---------------------------------------------------
+# Sparse neighbor graph up to the largest eps, computed once
+# ---------------------------------------------------
+# One KD-tree radius query at max(eps) serves the whole sweep: DBSCAN on a
+# precomputed sparse graph only counts stored entries within its own eps,
+# so smaller eps values need no separate graph. Chord length on the unit
+# sphere is monotonic in great-circle distance, so Euclidean distances on
+# x/y/z with chord(eps) give the same neighbors as haversine with no trig
+# per pair. Duplicate points are kept as explicit zero entries.
+xyz = to_unit_xyz(coords[:, 0], coords[:, 1])
+
+nn = NearestNeighbors(
+    radius=chord(max(eps_values)),
+    metric="euclidean",
+    algorithm="kd_tree",
+    n_jobs=-1
+).fit(xyz)
+G = nn.radius_neighbors_graph(xyz, mode="distance")
+
+# float32 halves the stored distances shipped to every worker; chord(eps)
+# is ~1e-4, far above float32's resolution, so no neighbor test changes
+G.data = G.data.astype(np.float32)
+
+
+print("\n=== DBSCAN EPS Parameter Sweep ===\n")
 
-    labels = clustering.labels_
-    unique_clusters = set(labels)
+# The eps fits are independent, so run them side by side; loky memory-maps
+# the graph's arrays into the workers instead of copying them per task.
+# Results come back in eps_values order, so the printout is unchanged.
+# Capped at the core count; on a single core this runs in-process.
+n_jobs = min(len(eps_values), os.cpu_count() or 1)
+with parallel_config(backend="loky", inner_max_num_threads=1):
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(run_eps)(G, eps, min_samples) for eps in eps_values
+    )
 
+for eps, labels in results:
     # Noise points have label = -1
-    num_noise = list(labels).count(-1)
+    num_noise = int((labels == -1).sum())
 
-    # Number of REAL clusters (exclude -1)
-    num_clusters = len([c for c in unique_clusters if c != -1])
+    # Number of REAL clusters (exclude -1); DBSCAN numbers them 0..k-1
+    num_clusters = int(labels.max()) + 1
 
     print(f"EPS = {eps} km:")
     print(f"  → Real clusters found: {num_clusters}")
     print(f"  → Noise points: {num_noise}")
 
-    # Optional: show cluster sizes (excluding -1)
-    cluster_sizes = (
-        pd.Series(labels)
-        .value_counts()
-        .sort_index()
-        .rename("count")
-    )
+    # Optional: show cluster sizes (including noise as -1)
+    # bincount slot 0 is noise, slot k + 1 is cluster k
+    sizes = np.bincount(labels + 1)
+    cluster_ids = np.arange(-1, len(sizes) - 1)
+    cluster_sizes = pd.Series(sizes, index=cluster_ids)[sizes > 0]
 
     print("  → Cluster sizes:")
     print(cluster_sizes.to_string())